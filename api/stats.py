@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException
+
+from services.stats_service import StatsService
+
+router = APIRouter()
+service = StatsService()
+
+
+def _naive_utc(value: Optional[datetime]):
+    # агрегаты хранятся в naive UTC
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@router.get("/stats")
+async def get_stats(
+    granularity: Literal["total", "day", "hour"] = "total",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    since = _naive_utc(since)
+    until = _naive_utc(until)
+
+    if since and until and since > until:
+        raise HTTPException(status_code=400, detail="since не может быть позже until")
+
+    return await service.get_stats(granularity, since, until)
@@ -1,11 +1,27 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+import logging
 
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from config.settings import settings
 from schemas.ticket import EmailWebhook
 from services.ticket_service import TicketService
 
+logger = logging.getLogger("tickets")
+
 router = APIRouter()
 service = TicketService()
 
+# общий лимит на все batch-запросы, чтобы не перегружать GigaChat и SMTP
+batch_limit = asyncio.Semaphore(settings.WEBHOOK_BATCH_CONCURRENCY)
+
+# начатые обработки писем; ссылки нужны, чтобы задачи доработали
+# даже после отключения клиента
+_in_flight = set()
+
 
 @router.post("/webhook/email")
 async def handle_email(data: EmailWebhook):
@@ -26,7 +42,151 @@ async def handle_email(data: EmailWebhook):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+def _too_large(detail: str):
+    return HTTPException(status_code=413, detail=detail)
+
+
+def _parse_line(line: bytes):
+    # битая строка не должна ломать весь batch
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+
+async def _read_batch(request: Request):
+    """
+    Читает batch потоком и отвечает 413, как только превышен лимит по
+    размеру тела или (для NDJSON) по числу писем, не дочитывая остальное.
+    """
+    max_bytes = settings.WEBHOOK_BATCH_MAX_BYTES
+    max_items = settings.WEBHOOK_BATCH_MAX_SIZE
+    bytes_limit = f"Тело запроса больше {max_bytes} байт"
+    items_limit = f"Не больше {max_items} писем за запрос"
+
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_bytes:
+        raise _too_large(bytes_limit)
+
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+    items = []
+    chunks = []
+    tail = b""
+    size = 0
+
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise _too_large(bytes_limit)
+
+        if not ndjson:
+            chunks.append(chunk)
+            continue
+
+        *lines, tail = (tail + chunk).split(b"\n")
+        items.extend(_parse_line(line) for line in lines if line.strip())
+        if len(items) > max_items:
+            raise _too_large(items_limit)
+
+    if ndjson:
+        if tail.strip():
+            items.append(_parse_line(tail))
+    else:
+        try:
+            items = json.loads(b"".join(chunks))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Некорректный batch: {e}")
+
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Ожидается список писем")
+
+    if len(items) > max_items:
+        raise _too_large(items_limit)
+
+    return items
+
+
+def _finish_item(task: asyncio.Task):
+    batch_limit.release()
+    _in_flight.discard(task)
+
+    if not task.cancelled() and task.exception():
+        logger.error(f"Ошибка обработки письма из batch: {task.exception()}")
+
+
+async def wait_in_flight(timeout: float):
+    """Ждёт начатые письма из batch перед остановкой приложения."""
+    if not _in_flight:
+        return
+
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*_in_flight, return_exceptions=True),
+            timeout
+        )
+    except asyncio.TimeoutError:
+        logger.error(f"Не дождались {len(_in_flight)} писем из batch при остановке")
+
+
+async def _process_item(index: int, item):
+    if isinstance(item, ValueError):
+        return {"index": index, "status": "error", "error": str(item)}
+
+    try:
+        data = EmailWebhook.model_validate(item)
+    except ValidationError as e:
+        return {"index": index, "status": "error", "error": str(e)}
+
+    await batch_limit.acquire()
+
+    # начатую обработку доводим до конца даже при отключении клиента:
+    # иначе тикет останется в статусе new после отправки ответа клиенту
+    task = asyncio.create_task(service.process_email(
+        from_email=data.from_email,
+        subject=data.subject,
+        body=data.body
+    ))
+    _in_flight.add(task)
+    task.add_done_callback(_finish_item)
+
+    try:
+        ticket = await asyncio.shield(task)
+    except Exception as e:
+        return {"index": index, "status": "error", "error": str(e)}
+
+    return {
+        "index": index,
+        "status": "ok",
+        "ticket_id": ticket.id,
+        "ticket_status": ticket.status
+    }
+
+
+@router.post("/webhook/email/batch")
+async def handle_email_batch(request: Request):
+
+    items = await _read_batch(request)
+
+    async def results():
+        tasks = [
+            asyncio.create_task(_process_item(index, item))
+            for index, item in enumerate(items)
+        ]
+
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield json.dumps(await task, ensure_ascii=False) + "\n"
+        finally:
+            # клиент отключился: ждущие очереди письма отменяются,
+            # уже начатые дорабатываются под shield
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
 @router.get("/tickets")
 async def get_tickets():
     tickets = await service.repo.get_all()
-    return tickets
\ No newline at end of file
+    return tickets
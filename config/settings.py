@@ -15,6 +15,13 @@ class Settings(BaseSettings):
     EMAIL_ADDRESS: str | None = None
     EMAIL_PASSWORD: str | None = None
 
+    STATS_FLUSH_INTERVAL: float = 1.0
+
+    WEBHOOK_BATCH_CONCURRENCY: int = 5
+    WEBHOOK_BATCH_MAX_SIZE: int = 500
+    WEBHOOK_BATCH_MAX_BYTES: int = 10 * 1024 * 1024
+    WEBHOOK_SHUTDOWN_TIMEOUT: float = 30.0
+
     model_config = {
         "env_file": ".env"
     }
@@ -1,11 +1,18 @@
+import asyncio
+from contextlib import suppress
+
 import uvicorn
 from fastapi import FastAPI
 
-from api.tickets import router as tickets_router
+from api.stats import router as stats_router
+from api.tickets import router as tickets_router, wait_in_flight
+from config.settings import settings
 from core.database import init_db
+from services.stats_service import StatsService
 
 app = FastAPI(title="AI Support System")
 app.include_router(tickets_router, prefix="/api")
+app.include_router(stats_router, prefix="/api")
 
 
 from core.logger import setup_logger
@@ -15,6 +22,21 @@ setup_logger()
 @app.on_event("startup")
 async def startup():
     await init_db()
+    app.state.stats_flusher = asyncio.create_task(
+        StatsService().run_flusher(settings.STATS_FLUSH_INTERVAL)
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    # сначала даём доработать начатым письмам из batch,
+    # иначе их статус и статистика потеряются
+    await wait_in_flight(settings.WEBHOOK_SHUTDOWN_TIMEOUT)
+
+    app.state.stats_flusher.cancel()
+    with suppress(asyncio.CancelledError):
+        await app.state.stats_flusher
+    await StatsService().flush()
 
 @app.get("/health")
 async def health():
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, UniqueConstraint
+
+from core.database import Base
+
+
+class TicketStat(Base):
+    __tablename__ = "ticket_stats"
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket", "dimension", "value"),
+    )
+
+    id = Column(Integer, primary_key=True)
+
+    # "hour", "day" или "total"
+    granularity = Column(String(10), nullable=False)
+    bucket = Column(DateTime, nullable=False)
+
+    # status, sentiment, device_type, decision или stage
+    dimension = Column(String(50), nullable=False)
+    value = Column(String(200), nullable=False)
+
+    count = Column(Integer, nullable=False, default=0)
+    # суммарная длительность этапа в секундах (только для dimension == "stage")
+    duration_sum = Column(Float, nullable=False, default=0.0)
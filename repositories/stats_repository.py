@@ -0,0 +1,127 @@
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from core.database import AsyncSessionLocal
+from models.ticket import Ticket
+from models.ticket_stat import TicketStat
+
+
+TOTAL_BUCKET = datetime(1970, 1, 1)
+
+
+def bucket_for(granularity: str, moment: datetime) -> datetime:
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return TOTAL_BUCKET
+
+
+class StatsRepository:
+
+    GRANULARITIES = ("hour", "day", "total")
+
+    async def apply(self, deltas: dict):
+        """
+        Применяет дельты {(granularity, bucket, dimension, value): [count, duration]}.
+        Каждая строка коммитится отдельно, чтобы не держать блокировки
+        на агрегатах дольше одного UPDATE; записанные ключи удаляются из deltas.
+        """
+        async with AsyncSessionLocal() as session:
+            for key in list(deltas):
+                granularity, bucket, dimension, value = key
+                count, duration = deltas[key]
+                await self._upsert(
+                    session, granularity, bucket,
+                    dimension, value, count, duration
+                )
+                await session.commit()
+                del deltas[key]
+
+    async def _upsert(self, session, granularity, bucket,
+                      dimension, value, count, duration):
+        stmt = (
+            update(TicketStat)
+            .where(
+                TicketStat.granularity == granularity,
+                TicketStat.bucket == bucket,
+                TicketStat.dimension == dimension,
+                TicketStat.value == value,
+            )
+            .values(
+                count=TicketStat.count + count,
+                duration_sum=TicketStat.duration_sum + duration,
+            )
+        )
+
+        result = await session.execute(stmt)
+        if result.rowcount:
+            return
+
+        # строки ещё нет: вставляем, а если её успел вставить
+        # параллельный запрос — повторяем UPDATE
+        try:
+            async with session.begin_nested():
+                session.add(TicketStat(
+                    granularity=granularity,
+                    bucket=bucket,
+                    dimension=dimension,
+                    value=value,
+                    count=count,
+                    duration_sum=duration,
+                ))
+        except IntegrityError:
+            await session.execute(stmt)
+
+    async def get(self, granularity: str, since: datetime, until: datetime):
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(TicketStat)
+                .where(
+                    TicketStat.granularity == granularity,
+                    TicketStat.bucket >= since,
+                    TicketStat.bucket <= until,
+                )
+                .order_by(TicketStat.bucket)
+            )
+            return result.scalars().all()
+
+    async def rebuild(self, keys_for) -> int:
+        """
+        Пересчитывает счётчики измерений (кроме stage) по таблице tickets.
+        Чтение тикетов и замена агрегатов идут в одной транзакции.
+        Длительности этапов собираются только в момент обработки
+        и при пересчёте сохраняются.
+        """
+        counts = defaultdict(int)
+        processed = 0
+
+        async with AsyncSessionLocal() as session:
+            result = await session.stream_scalars(
+                select(Ticket).execution_options(yield_per=1000)
+            )
+            async for ticket in result:
+                for key in keys_for(ticket):
+                    counts[key] += 1
+                processed += 1
+
+            await session.execute(
+                delete(TicketStat).where(TicketStat.dimension != "stage")
+            )
+            session.add_all([
+                TicketStat(
+                    granularity=granularity,
+                    bucket=bucket,
+                    dimension=dimension,
+                    value=value,
+                    count=count,
+                    duration_sum=0.0,
+                )
+                for (granularity, bucket, dimension, value), count in counts.items()
+            ])
+            await session.commit()
+
+        return processed
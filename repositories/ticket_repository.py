@@ -13,7 +13,14 @@ class TicketRepository:
             await session.refresh(ticket)
             return ticket
 
+    async def update(self, ticket: Ticket):
+        async with AsyncSessionLocal() as session:
+            ticket = await session.merge(ticket)
+            await session.commit()
+            await session.refresh(ticket)
+            return ticket
+
     async def get_all(self):
         async with AsyncSessionLocal() as session:
             result = await session.execute(select(Ticket))
-            return result.scalars().all()
\ No newline at end of file
+            return result.scalars().all()
@@ -0,0 +1,18 @@
+import asyncio
+
+from core.database import init_db
+from core.logger import setup_logger
+from services.stats_service import StatsService
+
+
+# Запускать при остановленном приложении: письма, обработанные во время
+# пересчёта, и несброшенный буфер статистики приведут к расхождениям.
+async def main():
+    await init_db()
+    processed = await StatsService().backfill()
+    print(f"Пересчитано тикетов: {processed}")
+
+
+if __name__ == "__main__":
+    setup_logger()
+    asyncio.run(main())
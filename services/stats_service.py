@@ -0,0 +1,156 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from models.ticket import Ticket
+from repositories.stats_repository import StatsRepository, bucket_for
+
+
+logger = logging.getLogger("StatsService")
+
+
+# для тикетов, созданных до появления context["decision"]
+STATUS_TO_DECISION = {
+    "answered": "full_answer",
+    "need_info": "need_more_info",
+    "human_needed": "escalate_to_human",
+}
+
+DIMENSIONS = ("status", "sentiment", "device_type", "decision")
+
+DEFAULT_WINDOWS = {
+    "hour": timedelta(hours=24),
+    "day": timedelta(days=30),
+}
+
+
+def _value(value) -> str:
+    return str(value) if value else "unknown"
+
+
+def _decision(ticket: Ticket) -> str:
+    context = ticket.context or {}
+    return _value(context.get("decision") or STATUS_TO_DECISION.get(ticket.status))
+
+
+# Дельты копятся в памяти и сбрасываются в ticket_stats фоновой задачей,
+# поэтому обработка письма не ждёт блокировок на строках агрегатов.
+# Буфер общий для всех экземпляров StatsService.
+_pending = defaultdict(lambda: [0, 0.0])
+
+
+def _ticket_keys(ticket: Ticket):
+    """Ключи счётчиков тикета; общие для инкрементального пути и backfill."""
+    moment = ticket.created_at or ticket.date
+    if moment is None:
+        return []
+
+    values = {
+        "status": _value(ticket.status),
+        "sentiment": _value(ticket.sentiment),
+        "device_type": _value(ticket.device_type),
+        "decision": _decision(ticket),
+    }
+
+    return [
+        (granularity, bucket_for(granularity, moment), dimension, value)
+        for granularity in StatsRepository.GRANULARITIES
+        for dimension, value in values.items()
+    ]
+
+
+class StatsService:
+
+    def __init__(self):
+        self.repo = StatsRepository()
+
+    # --- инкрементальное обновление ---
+
+    def record_ticket(self, ticket: Ticket, timings: dict):
+        # счётчики строятся так же, как при backfill, сверху — длительности этапов
+        for key in _ticket_keys(ticket):
+            _pending[key][0] += 1
+
+        moment = ticket.created_at or ticket.date
+        if moment is None:
+            return
+
+        for granularity in StatsRepository.GRANULARITIES:
+            bucket = bucket_for(granularity, moment)
+            for stage, seconds in timings.items():
+                delta = _pending[(granularity, bucket, "stage", stage)]
+                delta[0] += 1
+                delta[1] += seconds
+
+    async def flush(self):
+        if not _pending:
+            return
+
+        deltas = dict(_pending)
+        _pending.clear()
+
+        try:
+            await self.repo.apply(deltas)
+        except Exception:
+            logger.exception("Не удалось сбросить статистику, повторим позже")
+        finally:
+            # apply убирает из deltas уже записанные строки,
+            # в буфер возвращается только остаток
+            for key, (count, duration) in deltas.items():
+                delta = _pending[key]
+                delta[0] += count
+                delta[1] += duration
+
+    async def run_flusher(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    # --- чтение ---
+
+    async def get_stats(self, granularity: str = "total",
+                        since: datetime | None = None,
+                        until: datetime | None = None):
+
+        if granularity == "total":
+            since = until = bucket_for("total", datetime.utcnow())
+        else:
+            until = until or datetime.utcnow()
+            since = since or until - DEFAULT_WINDOWS[granularity]
+            since = bucket_for(granularity, since)
+
+        buckets = {}
+
+        for row in await self.repo.get(granularity, since, until):
+            bucket = buckets.setdefault(row.bucket, {
+                "bucket": None if granularity == "total" else row.bucket,
+                **{dimension: {} for dimension in DIMENSIONS},
+                "stages": {},
+            })
+
+            if row.dimension == "stage":
+                bucket["stages"][row.value] = {
+                    "count": row.count,
+                    "avg_seconds": row.duration_sum / row.count if row.count else None,
+                }
+            elif row.count:
+                bucket[row.dimension][row.value] = row.count
+
+        return {
+            "granularity": granularity,
+            "buckets": list(buckets.values()),
+        }
+
+    # --- пересчёт ---
+
+    async def backfill(self) -> int:
+        """
+        Запускать при остановленном webhook: тикеты, обработанные во время
+        пересчёта, и ещё не сброшенный буфер приложения исказят агрегаты.
+        """
+        processed = await self.repo.rebuild(_ticket_keys)
+
+        logger.info(f"Статистика пересчитана по {processed} тикетам")
+
+        return processed
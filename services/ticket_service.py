@@ -1,3 +1,4 @@
+import time
 from datetime import datetime
 
 from models.ticket import Ticket
@@ -5,6 +6,7 @@ from repositories.ticket_repository import TicketRepository
 from services.ai_service import GigaChatClient
 from services.email_service import EmailService
 from services.notification_service import NotificationService
+from services.stats_service import StatsService
 
 
 class TicketService:
@@ -14,13 +16,18 @@ class TicketService:
         self.ai = GigaChatClient()
         self.email = EmailService()
         self.notify = NotificationService()
+        self.stats = StatsService()
 
     async def process_email(self, from_email: str, subject: str, body: str):
 
         print(f"📧 Получено письмо от {from_email}")
 
+        started = time.perf_counter()
+
         analysis = await self.ai.analyze_email(body, subject, from_email)
 
+        analyzed = time.perf_counter()
+
         if not analysis:
             raise Exception("AI не смог обработать письмо")
 
@@ -39,11 +46,39 @@ class TicketService:
             original_message=body,
             ai_draft=analysis.get("draft_reply"),
             status="new",
-            context={"subject": subject}
+            context={"subject": subject, "decision": decision}
         )
 
         ticket = await self.repo.create(ticket)
 
+        created = time.perf_counter()
+
+        timings = {
+            "analysis": analyzed - started,
+            "create": created - analyzed,
+        }
+
+        try:
+            await self._dispatch(ticket, decision, analysis, from_email, subject)
+            await self.repo.update(ticket)
+        except Exception:
+            # в базе тикет остался в статусе new — так его и учитываем
+            ticket.status = "new"
+            self.stats.record_ticket(ticket, timings)
+            raise
+
+        finished = time.perf_counter()
+
+        timings["dispatch"] = finished - created
+        timings["total"] = finished - started
+
+        self.stats.record_ticket(ticket, timings)
+
+        return ticket
+
+    async def _dispatch(self, ticket: Ticket, decision: str, analysis: dict,
+                        from_email: str, subject: str):
+
         if decision == "full_answer":
 
             await self.email.send_email(
@@ -73,8 +108,4 @@ class TicketService:
                 f"{ticket.issue_summary}"
             )
 
-            ticket.status = "human_needed"
-
-        await self.repo.update(ticket)
-
-        return ticket
\ No newline at end of file
+            ticket.status = "human_needed"
\ No newline at end of file
@@ -0,0 +1,66 @@
+import os
+import tempfile
+
+# настройки читаются при импорте, поэтому окружение задаём до импорта приложения
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/test.db"
+os.environ.setdefault("GIGACHAT_AUTH_KEY", "test")
+os.environ.setdefault("GIGACHAT_CLIENT_ID", "test")
+# фоновый flusher не должен вмешиваться: статистику пишет только flush_stats
+os.environ["STATS_FLUSH_INTERVAL"] = "1000000"
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api.tickets
+import services.stats_service
+from core.database import Base, engine
+from main import app
+from services.stats_service import StatsService
+
+
+DECISIONS = {
+    "answer": "full_answer",
+    "info": "need_more_info",
+    "human": "escalate_to_human",
+}
+
+
+async def fake_analyze_email(email_text, subject="", sender=""):
+    if email_text == "boom":
+        raise RuntimeError("AI недоступен")
+
+    return {
+        "decision": DECISIONS[email_text],
+        "draft_reply": "Ответ",
+        "device_type": "pump",
+        "sentiment": "нейтрально",
+    }
+
+
+async def noop(*args, **kwargs):
+    pass
+
+
+async def reset_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    services.stats_service._pending.clear()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    service = api.tickets.service
+    monkeypatch.setattr(service.ai, "analyze_email", fake_analyze_email)
+    monkeypatch.setattr(service.email, "send_email", noop)
+    monkeypatch.setattr(service.notify, "notify", noop)
+
+    with TestClient(app) as client:
+        client.portal.call(reset_db)
+        yield client
+
+
+@pytest.fixture
+def flush_stats(client):
+    return lambda: client.portal.call(StatsService().flush)
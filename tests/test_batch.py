@@ -0,0 +1,186 @@
+import asyncio
+import json
+
+import api.tickets
+from config.settings import settings
+
+
+def email(body):
+    return {"from_email": "client@example.com", "subject": "Тема", "body": body}
+
+
+def results(response):
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    return {line["index"]: line for line in lines}
+
+
+def test_batch_reports_every_item(client):
+    response = client.post("/api/webhook/email/batch", json=[
+        email("answer"),
+        email("boom"),
+        {"from_email": "client@example.com"},
+        email("human"),
+    ])
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    items = results(response)
+    assert sorted(items) == [0, 1, 2, 3]
+    assert items[0]["status"] == "ok"
+    assert items[0]["ticket_status"] == "answered"
+    assert items[1] == {"index": 1, "status": "error", "error": "AI недоступен"}
+    assert items[2]["status"] == "error"
+    assert items[3]["ticket_status"] == "human_needed"
+
+
+def test_ndjson_batch_skips_broken_lines(client):
+    body = "\n".join([
+        json.dumps(email("info")),
+        "{не json",
+        "",
+        json.dumps(email("answer")),
+    ])
+
+    response = client.post(
+        "/api/webhook/email/batch",
+        content=body.encode(),
+        headers={"content-type": "application/x-ndjson"},
+    )
+
+    items = results(response)
+    assert sorted(items) == [0, 1, 2]
+    assert items[0]["ticket_status"] == "need_info"
+    assert items[1]["status"] == "error"
+    assert items[2]["ticket_status"] == "answered"
+
+
+def test_batch_rejects_non_list(client):
+    response = client.post("/api/webhook/email/batch", json=email("info"))
+    assert response.status_code == 400
+
+
+def test_batch_limits(client, monkeypatch):
+    monkeypatch.setattr(settings, "WEBHOOK_BATCH_MAX_SIZE", 2)
+
+    response = client.post(
+        "/api/webhook/email/batch",
+        content="\n".join(json.dumps(email("info")) for _ in range(3)).encode(),
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.status_code == 413
+
+    response = client.post("/api/webhook/email/batch", json=[email("info")] * 3)
+    assert response.status_code == 413
+
+    monkeypatch.setattr(settings, "WEBHOOK_BATCH_MAX_BYTES", 10)
+
+    response = client.post("/api/webhook/email/batch", json=[email("info")])
+    assert response.status_code == 413
+
+
+async def post_and_disconnect(app, path, payload):
+    """Шлёт запрос напрямую в ASGI-приложение и отключается после первой строки."""
+    body = json.dumps(payload).encode()
+    request_sent = False
+    disconnected = asyncio.Event()
+    lines = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            lines.append(json.loads(message["body"]))
+            disconnected.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+
+    await app(scope, receive, send)
+    return lines
+
+
+def test_started_items_survive_disconnect(client, monkeypatch):
+    from main import app
+
+    processed = []
+
+    async def slow_process_email(from_email, subject, body):
+        await asyncio.sleep(0.2)
+        processed.append(body)
+
+    monkeypatch.setattr(api.tickets.service, "process_email", slow_process_email)
+
+    limit = settings.WEBHOOK_BATCH_CONCURRENCY
+    batch_limit = api.tickets.batch_limit
+
+    async def disconnect():
+        # невалидное письмо отвечает сразу, после него клиент отключается,
+        # пока limit писем обрабатываются, а ещё два ждут очереди
+        lines = await post_and_disconnect(
+            app,
+            "/api/webhook/email/batch",
+            [{"from_email": "client@example.com"}]
+            + [email(str(index)) for index in range(limit + 2)],
+        )
+        assert [line["index"] for line in lines] == [0]
+
+        await asyncio.gather(*api.tickets._in_flight)
+
+        # все разрешения семафора вернулись
+        for _ in range(limit):
+            assert not batch_limit.locked()
+            await batch_limit.acquire()
+        assert batch_limit.locked()
+        for _ in range(limit):
+            batch_limit.release()
+
+    client.portal.call(disconnect)
+
+    # начатые письма обработаны, ожидавшие очереди — отброшены
+    assert sorted(processed) == sorted(str(index) for index in range(limit))
+
+
+def test_shutdown_waits_for_started_items(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    processed = []
+
+    async def slow_process_email(from_email, subject, body):
+        await asyncio.sleep(0.1)
+        processed.append(body)
+
+    monkeypatch.setattr(api.tickets.service, "process_email", slow_process_email)
+
+    async def start():
+        asyncio.create_task(api.tickets._process_item(0, email("0")))
+        await asyncio.sleep(0.01)
+
+    with TestClient(app) as client:
+        client.portal.call(start)
+        assert processed == []
+
+    assert processed == ["0"]
@@ -0,0 +1,109 @@
+from collections import Counter
+
+from services.stats_service import DIMENSIONS, StatsService
+
+
+def send(client, body):
+    return client.post("/api/webhook/email", json={
+        "from_email": "client@example.com",
+        "subject": "Тема",
+        "body": body,
+    })
+
+
+def counts(stats):
+    # тикеты могут попасть по разные стороны границы часа или суток
+    totals = {dimension: Counter() for dimension in DIMENSIONS}
+    for bucket in stats["buckets"]:
+        for dimension in DIMENSIONS:
+            totals[dimension].update(bucket[dimension])
+    return {dimension: dict(total) for dimension, total in totals.items()}
+
+
+def stages(stats):
+    totals = Counter()
+    for bucket in stats["buckets"]:
+        for stage, value in bucket["stages"].items():
+            totals[stage] += value["count"]
+    return dict(totals)
+
+
+def test_stats_follow_ticket_status(client, flush_stats):
+    for body in ("answer", "info", "human", "answer"):
+        assert send(client, body).status_code == 200
+
+    flush_stats()
+
+    stats = client.get("/api/stats").json()
+    [bucket] = stats["buckets"]
+
+    assert bucket["status"] == {"answered": 2, "need_info": 1, "human_needed": 1}
+    assert bucket["decision"] == {
+        "full_answer": 2,
+        "need_more_info": 1,
+        "escalate_to_human": 1,
+    }
+    assert bucket["device_type"] == {"pump": 4}
+    assert set(bucket["stages"]) == {"analysis", "create", "dispatch", "total"}
+    assert all(stage["count"] == 4 for stage in bucket["stages"].values())
+
+    hourly = client.get("/api/stats", params={"granularity": "hour"}).json()
+    assert counts(hourly) == counts(stats)
+
+
+def test_failed_dispatch_keeps_ticket_new(client, flush_stats, monkeypatch):
+    import api.tickets
+
+    async def broken_send_email(*args, **kwargs):
+        raise ConnectionError("SMTP недоступен")
+
+    monkeypatch.setattr(api.tickets.service.email, "send_email", broken_send_email)
+
+    assert send(client, "answer").status_code == 500
+
+    flush_stats()
+
+    [bucket] = client.get("/api/stats").json()["buckets"]
+    assert bucket["status"] == {"new": 1}
+    assert set(bucket["stages"]) == {"analysis", "create"}
+
+
+def test_backfill_matches_incremental(client, flush_stats):
+    for body in ("answer", "info", "info", "human"):
+        send(client, body)
+
+    flush_stats()
+    incremental = client.get("/api/stats", params={"granularity": "day"}).json()
+
+    assert client.portal.call(StatsService().backfill) == 4
+
+    rebuilt = client.get("/api/stats", params={"granularity": "day"}).json()
+    assert counts(rebuilt) == counts(incremental)
+    # длительности этапов при пересчёте сохраняются
+    assert [bucket["stages"] for bucket in rebuilt["buckets"]] == [
+        bucket["stages"] for bucket in incremental["buckets"]
+    ]
+
+
+def test_stats_accept_timezone_aware_bounds(client, flush_stats):
+    send(client, "info")
+    flush_stats()
+
+    stats = client.get("/api/stats", params={
+        "granularity": "day",
+        "since": "2000-01-01T00:00:00+03:00",
+        "until": "2100-01-01T00:00:00Z",
+    })
+
+    assert stats.status_code == 200
+    assert counts(stats.json())["status"] == {"need_info": 1}
+
+
+def test_stats_reject_since_after_until(client):
+    response = client.get("/api/stats", params={
+        "granularity": "day",
+        "since": "2026-02-01T00:00:00Z",
+        "until": "2026-01-01T00:00:00Z",
+    })
+
+    assert response.status_code == 400